@@ -1,14 +1,29 @@
+import mimetypes
+import os
+import re
+from enum import Enum
+from functools import lru_cache
 from pathlib import Path
 from typing import Protocol, TypedDict
 
 import magic
-from typing_extensions import Required
+from typing_extensions import Required, NotRequired, Unpack
 
 from adapter.base_adapter import Image, Array
 from adapter.video_adapter import VideoAdapter, DefaultVideoAdapter
 
 
+class FileType(Enum):
+    IMAGE = "image"
+    AUDIO = "audio"
+    VIDEO = "video"
+    OTHER = "other"
+
+
 class FileTypeAdapter(Protocol):
+    def classify(self, path: Path) -> FileType:
+        ...
+
     def is_image(self, path: Path) -> bool:
         ...
 
@@ -37,9 +52,15 @@ class ImageAdapter(Protocol):
     def to_grayscale(self, image: Image) -> Image:
         ...
 
+    def to_lab(self, image: Image) -> Image:
+        ...
+
     def histogram(self, file_path: Path) -> tuple[Image, str]:
         ...
 
+    def file_checksum(self, file_path: Path) -> str:
+        ...
+
     def rgb_histogram(self, image: Image) -> list[int]:
         ...
 
@@ -97,22 +118,64 @@ class AudioAdapter(Protocol):
     def metrics(self, path: Path) -> Metrics:
         ...
 
+    def duration(self, path: Path) -> float:
+        ...
+
 
 class DefaultFileTypeAdapter(FileTypeAdapter):
+    HEADER_SIZE = 16
+    # Unambiguous leading signatures, compiled once into a single anchored
+    # pattern; anything else is left to libmagic
+    SIGNATURES = re.compile(
+        rb"(?P<image>\x89PNG\r\n\x1a\n|\xff\xd8\xff|GIF8[79]a|II\*\x00|MM\x00\*"
+        rb"|RIFF....WEBP)"
+        rb"|(?P<audio>ID3|fLaC|RIFF....WAVE)"
+        rb"|(?P<video>\x00\x00\x01[\xb3\xba]|RIFF....AVI\x20"
+        rb"|....ftyp(?:isom|iso[2-6]|mp4[12]|avc1|M4V\x20|qt\x20\x20))",
+        re.DOTALL,
+    )
+
+    class Arguments(TypedDict):
+        trust_extensions: NotRequired[bool]
+
+    def __init__(self, **kwargs: Unpack[Arguments]):
+        kwargs = self.Arguments(**kwargs)
+        # Opt-in, since a wrong extension would then go undetected
+        self._trust_extensions = kwargs.get("trust_extensions", False)
+
+    def classify(self, path: Path) -> FileType:
+        if self._trust_extensions:
+            mime, _ = mimetypes.guess_type(path)
+            if mime is not None:
+                return self._file_type(mime)
+        # The stat fields key the cache, so rewritten files are sniffed again
+        stat = os.stat(path)
+        return self._sniff(Path(path), stat.st_mtime_ns, stat.st_size)
+
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def _sniff(cls, path: Path, _mtime_ns: int, _size: int) -> FileType:
+        with open(path, "rb") as file:
+            header = file.read(cls.HEADER_SIZE)
+        if match := cls.SIGNATURES.match(header):
+            return FileType(match.lastgroup)
+        return cls._file_type(magic.from_file(path, mime=True) or "")
+
+    @staticmethod
+    def _file_type(mime: str) -> FileType:
+        try:
+            return FileType(mime.lower().split("/", 1)[0])
+        except ValueError:
+            return FileType.OTHER
+
     def is_image(self, path: Path) -> bool:
-        return self._is_in_category(path, "image")
+        return self.classify(path) is FileType.IMAGE
 
     def is_audio(self, path: Path) -> bool:
-        return self._is_in_category(path, "audio")
+        return self.classify(path) is FileType.AUDIO
 
     def is_video(self, path: Path) -> bool:
-        return self._is_in_category(path, "video")
-
-    @staticmethod
-    def _is_in_category(path: Path, category: str) -> bool:
-        return (mime := magic.from_file(path, mime=True)) and mime.lower().startswith(
-            category
-        )
+        return self.classify(path) is FileType.VIDEO
 
 
 class NullDigest(Digest):
@@ -121,3 +184,29 @@ class NullDigest(Digest):
 
     def hexdigest(self) -> str:
         return "bebacafe"
+
+
+class Blake3Digest(Digest):
+    """Opt-in BLAKE3 digest; needs the optional ``blake3`` package."""
+
+    def __init__(self, digest_size: int = 16):
+        import blake3
+
+        self._digest_size = digest_size
+        self._hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+
+    def update(self, data: bytes) -> None:
+        self._hasher.update(data)
+
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest(length=self._digest_size)
+
+    def copy(self) -> "Blake3Digest":
+        return self._from_hasher(self._digest_size, self._hasher.copy())
+
+    @classmethod
+    def _from_hasher(cls, digest_size: int, hasher) -> "Blake3Digest":
+        digest = cls.__new__(cls)
+        digest._digest_size = digest_size
+        digest._hasher = hasher
+        return digest
@@ -8,9 +8,14 @@ from adapter import AudioAdapter
 
 class LibrosaAudioAdapter(AudioAdapter):
     def metrics(self, path: Path) -> AudioAdapter.Metrics:
-        y, sr = librosa.load(path.as_posix())
-        duration = librosa.get_duration(y=y, sr=sr)
-        return AudioAdapter.Metrics(duration=duration, entropy=self._compute_entropy(y))
+        y, _ = librosa.load(path.as_posix())
+        return AudioAdapter.Metrics(
+            duration=self.duration(path), entropy=self._compute_entropy(y)
+        )
+
+    def duration(self, path: Path) -> float:
+        # Read from the container header where possible, without decoding
+        return librosa.get_duration(path=path.as_posix())
 
     # noinspection PyPep8Naming
     @staticmethod
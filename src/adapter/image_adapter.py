@@ -1,4 +1,8 @@
+import io
+import mmap
+import os
 from base64 import b64decode
+from functools import cached_property
 from hashlib import blake2b
 from io import BytesIO
 from pathlib import Path
@@ -13,9 +17,31 @@ from scipy.signal import convolve2d
 from scipy.stats import skew, kurtosis
 from typing_extensions import NotRequired, Unpack
 
+try:
+    from hashlib import file_digest
+except ImportError:
+    from hashlib_alt import file_digest
+
 import fracdim
 from adapter import ImageAdapter, Digest
 
+HISTOGRAM_CHUNK_SIZE = 32 * 1024 * 1024
+PAIR_BLOCK_SIZE = 1024 * 1024
+THUMBNAIL_SIZE = (256, 256)
+
+
+def histogram_entropy(image: Image) -> float:
+    """
+    Shannon entropy in bits of the image histogram, all bands pooled,
+    as computed natively by Pillow >= 6.1.
+    """
+    counts = np.asarray(image.histogram(), dtype=np.float64)
+    p = counts[counts > 0] / counts.sum()
+    return float(-np.dot(p, np.log2(p)))
+
+
+_entropy = getattr(PIL.Image.Image, "entropy", histogram_entropy)
+
 
 class DefaultImageAdapter(ImageAdapter):
     class Arguments(TypedDict):
@@ -32,36 +58,89 @@ class DefaultImageAdapter(ImageAdapter):
 
     def histogram(self, file_path: Path) -> tuple[Image, str]:
         digest = self._digest.copy()
-        hist = np.zeros((256, 256), dtype=np.uint8)
+        pair_counts = np.zeros(256 * 256, dtype=np.int64)
+        with file_path.open("rb") as f:
+            if os.fstat(f.fileno()).st_size < io.DEFAULT_BUFFER_SIZE:
+                # Small files fit in one read, which is cheaper than a mapping.
+                # Special files may report a size of 0 and still have content.
+                if not (data := f.read()):
+                    return self._empty_file_histogram
+                self._count_byte_pairs(data, digest, pair_counts)
+            else:
+                try:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    # Some FUSE and special files cannot be mapped
+                    mm = None
+                if mm is None:
+                    while chunk := f.read(HISTOGRAM_CHUNK_SIZE):
+                        self._count_byte_pairs(chunk, digest, pair_counts)
+                else:
+                    # Hash and count the mapped pages in place, without
+                    # copying them into intermediate bytes objects
+                    with mm:
+                        if hasattr(mmap, "MADV_SEQUENTIAL"):
+                            mm.madvise(mmap.MADV_SEQUENTIAL)
+                        self._count_byte_pairs(mm, digest, pair_counts)
+        return self._histogram_image(pair_counts), digest.hexdigest()
+
+    @cached_property
+    def _empty_file_histogram(self) -> tuple[Image, str]:
+        # Every empty file has the same histogram and checksum
+        pair_counts = np.zeros(256 * 256, dtype=np.int64)
+        return self._histogram_image(pair_counts), self._digest.copy().hexdigest()
+
+    @staticmethod
+    def _histogram_image(pair_counts: np.ndarray) -> Image:
+        # The histogram image has always been built from 8-bit counts,
+        # which wrap around past 255
+        hist = pair_counts.reshape((256, 256)).astype(np.uint8)
+        scaled = (hist.astype(np.uint32) * 0xFFFFFF) // max(int(hist.max(initial=0)), 1)
+        # Big-endian bytes 1..3 of each scaled count are its R, G and B values,
+        # so one strided view replaces shifting and masking once per channel.
+        # Arithmetic results are native-endian, hence the explicit conversion.
+        scaled = scaled.astype(">u4")
+        rgb_hist = np.ascontiguousarray(
+            scaled.view(np.uint8).reshape((256, 256, 4))[:, :, 1:]
+        )
+        return PIL.Image.fromarray(rgb_hist, "RGB")
+
+    @staticmethod
+    def _count_byte_pairs(buffer, digest: Digest, pair_counts: np.ndarray) -> None:
+        # Views on the buffer must not outlive this call, so that the
+        # caller can close the underlying mmap
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        pairs = np.empty(PAIR_BLOCK_SIZE, dtype=np.uint16)
+        for start in range(0, data.size, HISTOGRAM_CHUNK_SIZE):
+            chunk = data[start : start + HISTOGRAM_CHUNK_SIZE]
+            digest.update(chunk)
+            # Encode each (x, y) byte pair as x << 8 | y into one reused
+            # buffer, so that bincount replaces the much slower np.add.at
+            for i in range(0, chunk.size - 1, PAIR_BLOCK_SIZE):
+                n = min(PAIR_BLOCK_SIZE, chunk.size - 1 - i)
+                np.left_shift(chunk[i : i + n], 8, out=pairs[:n], dtype=np.uint16)
+                np.bitwise_or(pairs[:n], chunk[i + 1 : i + n + 1], out=pairs[:n])
+                pair_counts += np.bincount(pairs[:n], minlength=pair_counts.size)
+
+    def file_checksum(self, file_path: Path) -> str:
         with file_path.open("rb") as f:
-            while chunk := f.read(32 * 1024 * 1024):
-                digest.update(chunk)
-                np.frombuffer(chunk, dtype=np.uint8)
-                data = np.frombuffer(chunk, dtype=np.uint8)
-                x = data[:-1]
-                y = data[1:]
-                np.add.at(hist, (x, y), 1)
-
-        hist = (hist * 0xFFFFFF) // np.clip(hist.max(initial=0), a_min=1, a_max=None)
-        rgb_hist = np.array(
-            [(hist >> 16) & 0xFF, (hist >> 8) & 0xFF, hist & 0xFF], dtype=np.uint8
-        ).transpose((1, 2, 0))
-
-        histogram_image = PIL.Image.fromarray(rgb_hist, "RGB")
-        return histogram_image, digest.hexdigest()
+            return file_digest(f, self._digest.copy).hexdigest()
 
     def thumbnail(self, source: Image) -> Image:
+        if source.mode == "RGB" and source.size == THUMBNAIL_SIZE:
+            # Already thumbnail-shaped, as histogram images always are, and
+            # converting or resizing it would only produce identical copies
+            return source
         thumbnail_image: PIL.Image = source.convert(mode="RGB").resize(
-            (256, 256), PIL.Image.BICUBIC
+            THUMBNAIL_SIZE, PIL.Image.BICUBIC
         )
         return thumbnail_image
 
     def fractal_dimension(self, grayscale: Image) -> list[float]:
         # noinspection PyTypeChecker
-        return [
-            fracdim.fractal_dimension(np.array(grayscale), level)
-            for level in range(0, 256, 4)
-        ]
+        return fracdim.fractal_dimensions(
+            np.asarray(grayscale), np.arange(0, 256, 4)
+        ).tolist()
 
     def contrast(self, grayscale: Image) -> float:
         histogram = grayscale.histogram()
@@ -87,6 +166,9 @@ class DefaultImageAdapter(ImageAdapter):
     def to_grayscale(self, image: Image) -> Image:
         return image.convert("L")
 
+    def to_lab(self, image: Image) -> Image:
+        return image if image.mode == "LAB" else image.convert("LAB")
+
     def rgb_histogram(self, image: Image) -> list[int]:
         return image.histogram()
 
@@ -99,7 +181,8 @@ class DefaultImageAdapter(ImageAdapter):
         edges = grayscale.filter(ImageFilter.FIND_EDGES)
 
         # Calculate the mean pixel value of the edges image
-        return sum(edges.getdata()) / len(edges.getdata())
+        # noinspection PyTypeChecker
+        return np.asarray(edges).mean().item()
 
     # noinspection PyTypeChecker
     def colourfulness(self, image: Image) -> float:
@@ -109,7 +192,7 @@ class DefaultImageAdapter(ImageAdapter):
         :return: float colorfulness value
         """
         # Convert the image to the LAB color space
-        image_lab = image.convert("LAB")
+        image_lab = self.to_lab(image)
 
         # Split the LAB channels
         L, A, B = image_lab.split()
@@ -130,7 +213,7 @@ class DefaultImageAdapter(ImageAdapter):
     def sharpness(self, grayscale: Image) -> float:
         # Convert PIL Image to numpy array
         # noinspection PyTypeChecker
-        img_arr = np.array(grayscale)
+        img_arr = np.asarray(grayscale)
 
         # Compute Laplacian using 3x3 filter kernel
         laplacian_kernel = np.array([[0, 1, 0], [1, -4, 1], [0, 1, 0]])
@@ -144,7 +227,7 @@ class DefaultImageAdapter(ImageAdapter):
     def blurriness(self, grayscale: Image) -> float:
         # Convert PIL Image to numpy array
         # noinspection PyTypeChecker
-        img_arr = np.array(grayscale)
+        img_arr = np.asarray(grayscale)
 
         # Apply Laplacian of Gaussian filter
         log_kernel = np.array(
@@ -166,7 +249,7 @@ class DefaultImageAdapter(ImageAdapter):
     def noise(self, grayscale: Image) -> float:
         # Convert PIL image to numpy array
         # noinspection PyTypeChecker
-        img_arr = np.array(grayscale)
+        img_arr = np.asarray(grayscale)
 
         # Compute the standard deviation of the pixel intensities
         stddev = np.std(img_arr)
@@ -200,7 +283,7 @@ class DefaultImageAdapter(ImageAdapter):
         Computes the vibrance of the given image.
         """
         # Convert the image to the Lab color space
-        lab_image = image.convert("LAB")
+        lab_image = self.to_lab(image)
 
         # Split the image into its three channels
         l_channel, a_channel, b_channel = lab_image.split()
@@ -215,7 +298,7 @@ class DefaultImageAdapter(ImageAdapter):
         return vibrance.item()
 
     def entropy(self, image: Image) -> float:
-        return image.entropy()
+        return _entropy(image)
 
     def quadrants(self, image: Image) -> tuple[Image, Image, Image, Image]:
         width, height = image.size
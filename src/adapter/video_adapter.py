@@ -16,6 +16,7 @@ from adapter import Image
 DEFAULT_TIMEOUT = 60
 DEFAULT_SIZE = 256
 DEFAULT_START_PERCENTAGE = 2.5
+MAX_GRAB_DISTANCE = 32
 
 
 class VideoAdapter(Protocol):
@@ -144,13 +145,30 @@ class OpencvVideoAdapter(VideoAdapter):
             missed_frames: list[int] = []
             start = time.monotonic()
             progress = 0
+            # Position of the next frame grab() reads, None once unknown
+            next_frame: Optional[int] = spec.frame_numbers[0]
             # read and process frames
             for frame_number in spec.frame_numbers:
                 progress += 1
-                if not cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number):
-                    raise IOError(f"opencv set {frame_number=}")
-                # read the next frame
-                ret, frame = cap.read()
+                # Nearby frames are reached with grab(), which skips the BGR
+                # conversion that retrieve() does only for sampled frames;
+                # farther ones are cheaper to seek to
+                if (
+                    next_frame is not None
+                    and 0 <= frame_number - next_frame <= MAX_GRAB_DISTANCE
+                ):
+                    while next_frame < frame_number and cap.grab():
+                        next_frame += 1
+                if next_frame != frame_number:
+                    # Too far away, or a grab failed on the way
+                    if not cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number):
+                        raise IOError(f"opencv set {frame_number=}")
+                ret, frame = cap.grab(), None
+                if ret:
+                    # A failed decode counts as a missed frame too
+                    ret, frame = cap.retrieve()
+                # After a failure, the next sampled frame is sought directly
+                next_frame = frame_number + 1 if ret else None
                 if (time.monotonic() - start) > DEFAULT_TIMEOUT and progress < len(
                     spec.frame_numbers
                 ) * 3 / 4:
@@ -244,24 +262,31 @@ class FfmpegVideoAdapter(VideoAdapter):
 
         # capture output and process frames
         out, _ = ffmpeg.run(stream, capture_stdout=True, capture_stderr=True)
+        # Slice frames out of a view on the output, rather than re-copying the
+        # remaining bytes after every frame
+        out = memoryview(out)
+        frame_size = width * height * 3
         for i in range(target_number_of_frames):
             # calculate the frame number based on the loop index and target frame rate
             frame_number = int(start_frame + i * spec.metrics.frame_rate / target_fps)
             position = frame_number / total_number_of_frames
             # read one frame (width * height * 3 bytes) at a time
-            frame = out[: width * height * 3]
+            frame = out[i * frame_size : (i + 1) * frame_size]
             if not frame:
                 break
             # convert bytes to image
             img = PIL.Image.frombuffer(data=frame, mode="RGB", size=(width, height))
             # append the image and its frame number to the list of frames
             frames.append((img, position))
-            # remove the frame bytes from the output bytes
-            out = out[width * height * 3 :]
         return frames
 
-    @lru_cache
     def _probe(self, path: Path) -> dict:
+        # The stat fields key the cache, so rewritten files are probed again
+        stat = path.stat()
+        return self._probe_version(path, stat.st_mtime_ns, stat.st_size)
+
+    @lru_cache
+    def _probe_version(self, path: Path, _mtime_ns: int, _size: int) -> dict:
         # probe the video file to get test_metadata
         try:
             return ffmpeg.probe(path)
@@ -282,6 +307,11 @@ class FfmpegVideoAdapter(VideoAdapter):
         return video_stream
 
     def _get_vn_stream(self, path: Path):
+        stat = path.stat()
+        return self._get_vn_stream_version(path, stat.st_mtime_ns, stat.st_size)
+
+    @lru_cache
+    def _get_vn_stream_version(self, path: Path, _mtime_ns: int, _size: int):
         try:
             return ffmpeg.probe(
                 str(path),
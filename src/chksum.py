@@ -3,9 +3,15 @@ import mmap
 import re
 import sys
 import traceback
+import weakref
 from abc import ABC, abstractmethod
 from argparse import ArgumentParser, Namespace
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
 from dataclasses import dataclass
 from functools import cached_property
 from pathlib import Path
@@ -67,32 +73,60 @@ class Digester(Protocol):
 
 class QuarterSha256Base36Digester(Digester):
     LENGTH = 13
+    CHUNK_SIZE = 64 * 1024 * 1024
+    SMALL_FILE_SIZE = 256 * 1024
 
     @property
     def checksum_regex(self) -> str:
         return rf"[0-3][0-9a-z]{{{self.LENGTH-1}}}"
 
     def compute_digest(self, file: Path) -> Checksum:
+        size = file.stat().st_size
+        if size == 0:
+            # Empty files are common in scans and all share one checksum
+            return Checksum(file, self._empty_file_checksum)
+
+        if size < self.SMALL_FILE_SIZE:
+            # A single read is cheaper than setting up a mapping
+            hash_algorithm = hashlib.sha256(file.read_bytes())
+            return Checksum(file, self._to_checksum(hash_algorithm.digest()))
+
         # Create an instance of the SHA256 hash algorithm
         hash_algorithm = hashlib.sha256()
+        with open(file, "rb") as input_file:
+            with mmap.mmap(
+                input_file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mmapped_file, memoryview(mmapped_file) as view:
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mmapped_file.madvise(mmap.MADV_SEQUENTIAL)
+                released = 0
+                for offset in range(0, len(view), self.CHUNK_SIZE):
+                    with view[offset : offset + self.CHUNK_SIZE] as chunk:
+                        hash_algorithm.update(chunk)
+                    if hasattr(mmap, "MADV_DONTNEED"):
+                        # Unmap whole pages already hashed so resident memory
+                        # stays near one chunk; the page cache is untouched
+                        end = min(offset + self.CHUNK_SIZE, len(view))
+                        hashed = end // mmap.PAGESIZE * mmap.PAGESIZE
+                        if hashed > released:
+                            mmapped_file.madvise(
+                                mmap.MADV_DONTNEED, released, hashed - released
+                            )
+                            released = hashed
+
+        return Checksum(file, self._to_checksum(hash_algorithm.digest()))
 
-        if file.stat().st_size > 0:
-            with open(file, "rb") as input_file:
-                with mmap.mmap(
-                    input_file.fileno(), 0, access=mmap.ACCESS_READ
-                ) as mmapped_file:
-                    hash_algorithm.update(mmapped_file)
+    @cached_property
+    def _empty_file_checksum(self) -> str:
+        return self._to_checksum(hashlib.sha256().digest())
 
-        # Obtain the digest or hash value
-        digest = hash_algorithm.digest()
+    def _to_checksum(self, digest: bytes) -> str:
         # Convert the first quarter of the digest to a decimal number
         decimal_number = int.from_bytes(
             digest[0 : len(digest) // 4], byteorder="big", signed=False
         )
         # Convert the decimal number to base-36, left-zero fill
-        checksum = self.base_36(decimal_number).zfill(self.LENGTH)
-
-        return Checksum(file, checksum)
+        return self.base_36(decimal_number).zfill(self.LENGTH)
 
     @staticmethod
     def base_36(number) -> str:
@@ -143,7 +177,10 @@ class FileRenamer(ChecksumRepository):
 
     def write_checksum(self, checksum: Checksum) -> Checksum:
         file = checksum.path
-        if not self.has_checksum(file) and self._can_have_checksum(file):
+        # One match answers both whether the name has a checksum and whether
+        # it can take one
+        match = self.checksum_pattern.fullmatch(file.name)
+        if match and not match.group("checksum"):
             new_path = file.parent / f"{file.stem}.{checksum}{file.suffix}"
             file.rename(new_path)
             return Checksum(new_path, checksum.value)
@@ -151,17 +188,14 @@ class FileRenamer(ChecksumRepository):
 
     def delete_checksum(self, checksum: Checksum) -> Checksum:
         file = checksum.path
-        if self.has_checksum(file):
-            match = self.checksum_pattern.fullmatch(file.name)
+        match = self.checksum_pattern.fullmatch(file.name)
+        if match and match.group("checksum"):
             if new_file_name := f"{match.group('prefix')}{match.group('suffix') or ''}":
                 new_path = file.parent / new_file_name
                 file.rename(new_path)
                 return Checksum(new_path, checksum.value)
         return checksum
 
-    def _can_have_checksum(self, file: Path) -> bool:
-        return bool(self.checksum_pattern.fullmatch(file.name))
-
 
 class ConsolePresenter(Presenter):
     def ok(self, checksum: Checksum) -> None:
@@ -320,19 +354,42 @@ class DeleteCommand(Command):
                 self.presenter.fail(checksum)
 
 
-class ProcessPoolChecksumCalculator(ChecksumCalculator):
+class ExecutorChecksumCalculator(ChecksumCalculator):
+    executor_type: type[Executor]
+
     def __init__(self, digester: Digester):
         self.digester = digester
 
     def compute_checksums(self, files: list[Path]) -> Generator[Checksum, None, None]:
-        with ProcessPoolExecutor() as executor:
-            # Submit tasks and get futures
-            futures = {
-                executor.submit(self.digester.compute_digest, f): f for f in files
-            }
-            # Use as_completed to yield results as they become available
-            for future in as_completed(futures):
-                yield future.result()
+        if len(files) < 2:
+            # Starting workers costs more than hashing one file
+            yield from map(self.digester.compute_digest, files)
+            return
+        # Submit tasks and get futures
+        futures = {
+            self._executor.submit(self.digester.compute_digest, f): f for f in files
+        }
+        # Use as_completed to yield results as they become available
+        for future in as_completed(futures):
+            yield future.result()
+
+    @cached_property
+    def _executor(self) -> Executor:
+        # Workers are started once and reused by every command of a run, and
+        # shut down with the calculator or at exit, whichever comes first
+        executor = self.executor_type()
+        weakref.finalize(self, executor.shutdown)
+        return executor
+
+
+class ProcessPoolChecksumCalculator(ExecutorChecksumCalculator):
+    executor_type = ProcessPoolExecutor
+
+
+class ThreadPoolChecksumCalculator(ExecutorChecksumCalculator):
+    # hashlib releases the GIL while hashing large buffers, so threads hash
+    # in parallel without pickling the digester for worker processes
+    executor_type = ThreadPoolExecutor
 
 
 class CommandLineInputHandler(InputHandler):
@@ -377,7 +434,7 @@ class Main:
         self.command_factory = CommandFactory(
             presenter=ConsolePresenter(),
             input_handler=CommandLineInputHandler(),
-            calculator=ProcessPoolChecksumCalculator(digester),
+            calculator=ThreadPoolChecksumCalculator(digester),
             repository=FileRenamer(digester),
         )
 
@@ -10,22 +10,13 @@ import numpy as np
 
 
 def fractal_dimension(Z: np.ndarray, threshold=128):
-    # Only for 2d image
-    assert len(Z.shape) == 2
-
-    # From https://github.com/rougier/numpy-100 (#87)
-    def boxcount(Z, k):
-        S = np.add.reduceat(
-            np.add.reduceat(Z, np.arange(0, Z.shape[0], k), axis=0),
-            np.arange(0, Z.shape[1], k),
-            axis=1,
-        )
+    return fractal_dimensions(Z, [threshold])[0]
 
-        # We count non-empty (0) and non-full boxes (k*k)
-        return len(np.where((S > 0) & (S < k * k))[0])
 
-    # Transform Z into a binary array
-    Z = Z <= threshold
+def fractal_dimensions(Z: np.ndarray, thresholds) -> np.ndarray:
+    """Fractal dimension of the image Z <= t, for each threshold t."""
+    # Only for 2d image
+    assert len(Z.shape) == 2
 
     # Minimal dimension of image
     p = min(Z.shape)
@@ -39,11 +30,57 @@ def fractal_dimension(Z: np.ndarray, threshold=128):
     # Build successive box sizes (from 2**n down to 2**1)
     sizes = 2 ** np.arange(n, 1, -1)
 
-    # Actual box counting with decreasing size
-    counts = []
-    for size in sizes:
-        counts.append(boxcount(Z, size))
+    # Replace pixel values by their ranks among the distinct levels; 8-bit
+    # values already are their own ranks
+    if Z.dtype == np.uint8:
+        levels, ranks = np.arange(256), Z
+    else:
+        levels, ranks = np.unique(Z, return_inverse=True)
+        ranks = ranks.reshape(Z.shape)
+
+    # Number of levels at or below each threshold
+    index = np.searchsorted(levels, thresholds, side="right")
 
-    # Fit the successive log(sizes) with log (counts)
-    coeffs = np.polyfit(np.log(sizes), np.log(np.array(counts) + 0.000001), 1)
+    # Actual box counting with decreasing size, for all thresholds at once
+    counts = _box_counts(ranks, sizes, index, levels.size)
+
+    # Fit the successive log(sizes) with log (counts), one column per threshold
+    coeffs = np.polyfit(np.log(sizes), np.log(counts.T + 0.000001), 1)
     return -coeffs[0]
+
+
+def _box_counts(ranks: np.ndarray, sizes: np.ndarray, index: np.ndarray, levels: int):
+    """
+    Counts boxes that are neither empty nor full in ranks < i, for every
+    index i (rows) and box size (columns). A box is non-empty once i
+    exceeds its lowest rank, and full once i exceeds its highest, so the
+    counts for all indices follow from the per-box minima and maxima.
+    """
+    # Box minima, maxima and pixel counts for doubling sizes, each level
+    # pooled from the previous one
+    boxes = {}
+    lo, hi, n = ranks, ranks, np.ones(ranks.shape, dtype=np.intp)
+    for size in 2 ** np.arange(1, int(sizes.max(initial=1)).bit_length()):
+        lo, hi, n = _pool(lo, np.minimum), _pool(hi, np.maximum), _pool(n, np.add)
+        boxes[size] = lo, hi, n
+
+    # Index 0 of the cumulative histograms stands for no level at all
+    counts = np.empty((index.size, sizes.size), dtype=np.int64)
+    for k, size in enumerate(sizes):
+        lo, hi, n = boxes[size]
+        # Edge boxes hold fewer than size * size pixels, so are never full
+        full = n == size * size
+        non_empty = np.bincount(lo.ravel(), minlength=levels).cumsum()
+        filled = np.bincount(hi[full], minlength=levels).cumsum()
+        counts[:, k] = np.concatenate(([0], non_empty - filled))[index]
+    return counts
+
+
+def _pool(S: np.ndarray, ufunc: np.ufunc) -> np.ndarray:
+    """Reduces 2x2 blocks; a trailing odd row or column forms partial blocks."""
+    h, w = S.shape
+    if h % 2 or w % 2:
+        # Sums are padded with zeros, minima and maxima with edge values
+        mode = "constant" if ufunc is np.add else "edge"
+        S = np.pad(S, ((0, h % 2), (0, w % 2)), mode=mode)
+    return ufunc.reduce(S.reshape(S.shape[0] // 2, 2, S.shape[1] // 2, 2), axis=(1, 3))
@@ -0,0 +1,8 @@
+def file_digest(fileobj, digest, /):
+    # file_digest(f, hashlib.sha256) --> hash of everything f.read() returns
+    digest_object = digest()
+    buffer = bytearray(2**18)
+    view = memoryview(buffer)
+    while size := fileobj.readinto(buffer):
+        digest_object.update(view[:size])
+    return digest_object
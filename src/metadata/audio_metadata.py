@@ -1,4 +1,3 @@
-from functools import cached_property
 from pathlib import Path
 
 from adapter import AudioAdapter
@@ -6,18 +5,26 @@ from .metadata_base import Metadata
 
 
 class AudioFileMetadata(Metadata):
+    __slots__ = ("_path", "_audio_adapter", "_duration", "_audio_metrics")
+
     def __init__(self, path: Path, audio_adapter: AudioAdapter):
         self._path = path
         self._audio_adapter = audio_adapter
+        self._duration = None
+        self._audio_metrics = None
 
     @property
     def duration(self) -> float:
-        return self._metrics["duration"]
+        if self._duration is None:
+            self._duration = self._audio_adapter.duration(self._path)
+        return self._duration
 
     @property
     def entropy(self) -> float:
         return self._metrics["entropy"]
 
-    @cached_property
+    @property
     def _metrics(self):
-        return self._audio_adapter.metrics(self._path)
+        if self._audio_metrics is None:
+            self._audio_metrics = self._audio_adapter.metrics(self._path)
+        return self._audio_metrics
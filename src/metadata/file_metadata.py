@@ -1,18 +1,22 @@
-from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from functools import cached_property, lru_cache
+from operator import attrgetter
 from pathlib import Path
-from typing import TypedDict, Type, Iterable, TypeVar
+from typing import TypedDict, Type, Iterable, TypeVar, Optional, Callable
 
 from typing_extensions import Unpack, NotRequired
 
 from adapter import (
+    Image,
     ImageAdapter,
     AudioAdapter,
     FileTypeAdapter,
+    FileType,
     VideoAdapter,
     DefaultFileTypeAdapter,
     DefaultVideoAdapter,
 )
-from adapter.audio_adapter import LibrosaAudioAdapter
 from adapter.image_adapter import DefaultImageAdapter
 from .audio_metadata import AudioFileMetadata
 from .image_metadata import ImageMetadata, ImageFileMetadata
@@ -21,10 +25,24 @@ from .video_metadata import VideoFileMetadata
 
 
 class FileMetadata(Metadata):
-    def __init__(self, path, image_adapter: ImageAdapter):
+    # Lazily computed values live in slots with None for "not yet computed",
+    # so that no instance ever needs a __dict__
+    __slots__ = (
+        "_image_adapter",
+        "_path",
+        "_size",
+        "_checksum",
+        "_histogram_image",
+        "_histogram_image_metadata",
+    )
+
+    def __init__(self, path, image_adapter: ImageAdapter, size: Optional[int] = None):
         self._image_adapter = image_adapter
         self._path = path
-        self._compute_metadata()
+        self._size = size
+        self._checksum = None
+        self._histogram_image = None
+        self._histogram_image_metadata = None
 
     @property
     def path(self) -> Path:
@@ -32,9 +50,12 @@ class FileMetadata(Metadata):
 
     @property
     def size(self) -> int:
-        return self._byte_size
+        if self._size is None:
+            # Unless the factory has already statted the file
+            self._size = self.path.stat().st_size
+        return self._size
 
-    @cached_property
+    @property
     def path_with_checksum(self) -> Path:
         return self.path.with_name(
             f"{self.path.stem}.{self.checksum}{self.path.suffix}"
@@ -42,22 +63,31 @@ class FileMetadata(Metadata):
 
     @property
     def checksum(self) -> str:
+        if self._checksum is None:
+            # Hash only, unless the histogram scan has already done it
+            self._checksum = self._image_adapter.file_checksum(self.path)
         return self._checksum
 
-    def _compute_metadata(self):
-        """
-        Creates fields: _byte_size, _checksum, _histogram_image_metadata
-        """
-        self._byte_size = self.path.stat().st_size
-        histogram_image, self._checksum = self._image_adapter.histogram(self.path)
-        self._histogram_image_metadata = ImageMetadata(
-            image=histogram_image,
-            image_adapter=self._image_adapter,
-            fractal_dimension=True,
-        )
+    @property
+    def checksum_bytes(self) -> bytes:
+        return bytes.fromhex(self.checksum)
+
+    @property
+    def histogram_image(self) -> Image:
+        if self._histogram_image is None:
+            self._histogram_image, self._checksum = self._image_adapter.histogram(
+                self.path
+            )
+        return self._histogram_image
 
     @property
     def histogram_image_metadata(self) -> ImageMetadata:
+        if self._histogram_image_metadata is None:
+            self._histogram_image_metadata = ImageMetadata(
+                image=self.histogram_image,
+                image_adapter=self._image_adapter,
+                fractal_dimension=True,
+            )
         return self._histogram_image_metadata
 
 
@@ -65,32 +95,49 @@ T = TypeVar("T", bound=Metadata)
 
 
 class CompositeMetadata(Metadata):
+    __slots__ = ("_aggregate",)
+
     def __init__(self, *metadata: T):
         super().__init__()
-        self._aggregate = {type(m): m for m in metadata}
+        self._aggregate: dict[type, Metadata] = {type(m): m for m in metadata}
 
     def add(self, metadata: T, overwrite=False) -> None:
         if not isinstance(metadata, Metadata):
             raise ValueError(f"Parameter must be instance of {Metadata}")
-        if (
-            not overwrite
-            and type(metadata) in self._aggregate
-            and metadata is not self._aggregate[type(metadata)]
-        ):
+        existing = self._aggregate.get(type(metadata))
+        if not overwrite and existing is not None and metadata is not existing:
             raise ValueError(
                 f"{type(metadata)} already added. Use overwrite=True to replace it."
             )
-        self._aggregate.update({type(metadata): metadata})
+        self._aggregate[type(metadata)] = metadata
 
     def get(self, cls: Type[T]) -> T:
-        return self._aggregate[cls]
+        if (metadata := self._aggregate.get(cls)) is not None:
+            return metadata
+        # Fall back to the first entry of a subclass of the requested type
+        for metadata_type, metadata in self._aggregate.items():
+            if issubclass(metadata_type, cls):
+                return metadata
+        raise KeyError(cls)
 
     @property
     def children(self) -> Iterable[Metadata]:
-        return self._aggregate.values()
+        return tuple(self._aggregate.values())
+
+
+@lru_cache(maxsize=None)
+def _default_adapter(adapter_type: type):
+    """Default adapters are shared by every factory.
+
+    Any per-file caching inside them is keyed on the file's mtime and size,
+    so a shared adapter never serves results for an older version of a file.
+    """
+    return adapter_type()
 
 
 class FileMetadataFactory:
+    METADATA_CACHE_SIZE = 1024
+
     class Arguments(TypedDict):
         image_adapter: NotRequired[ImageAdapter]
         audio_adapter: NotRequired[AudioAdapter]
@@ -98,39 +145,114 @@ class FileMetadataFactory:
         video_adapter: NotRequired[VideoAdapter]
 
     def __init__(self, **kwargs: Unpack[Arguments]):
-        kwargs = self.Arguments(**kwargs)
-        self._file_type_adapter = kwargs.get(
-            "file_type_adapter", DefaultFileTypeAdapter()
-        )
-        self._image_adapter = (
-            kwargs["image_adapter"]
-            if "image_adapter" in kwargs
-            else DefaultImageAdapter()
-        )
-        self._audio_adapter = (
-            kwargs["audio_adapter"]
-            if "audio_adapter" in kwargs
-            else LibrosaAudioAdapter()
-        )
-        self._video_adapter = (
-            kwargs["video_adapter"]
-            if "video_adapter" in kwargs
-            else DefaultVideoAdapter()
+        # Defaults are only built, and their modules imported, on first use
+        self._arguments = self.Arguments(**kwargs)
+        # Metadata is only rebuilt once the file has changed on disk, and
+        # only for the most recently used files, so that crawling a large
+        # tree does not keep every file's histogram and thumbnail alive
+        self._cached_children = lru_cache(maxsize=self.METADATA_CACHE_SIZE)(
+            self._build_children
         )
 
+    @cached_property
+    def _file_type_adapter(self) -> FileTypeAdapter:
+        if "file_type_adapter" in self._arguments:
+            return self._arguments["file_type_adapter"]
+        return _default_adapter(DefaultFileTypeAdapter)
+
+    @cached_property
+    def _image_adapter(self) -> ImageAdapter:
+        if "image_adapter" in self._arguments:
+            return self._arguments["image_adapter"]
+        return _default_adapter(DefaultImageAdapter)
+
+    @cached_property
+    def _audio_adapter(self) -> AudioAdapter:
+        if "audio_adapter" in self._arguments:
+            return self._arguments["audio_adapter"]
+        # Importing librosa takes seconds, so only pay for it with audio files
+        from adapter.audio_adapter import LibrosaAudioAdapter
+
+        return _default_adapter(LibrosaAudioAdapter)
+
+    @cached_property
+    def _video_adapter(self) -> VideoAdapter:
+        if "video_adapter" in self._arguments:
+            return self._arguments["video_adapter"]
+        return _default_adapter(DefaultVideoAdapter)
+
     def create_metadata(self, path: Path) -> CompositeMetadata:
+        try:
+            stat = path.stat()
+        except OSError:
+            return self._build_metadata(path, None)
+        children = self._cached_children(path, stat.st_mtime_ns, stat.st_size)
+        # A fresh composite for every call, so that whatever a caller adds
+        # to it does not change what later calls return
+        return CompositeMetadata(*children)
+
+    def _build_children(
+        self, path: Path, _mtime_ns: int, size: int
+    ) -> tuple[Metadata, ...]:
+        return self._build_metadata(path, size).children
+
+    def _build_metadata(self, path: Path, size: Optional[int]) -> CompositeMetadata:
         metadata = CompositeMetadata()
-        metadata.add(FileMetadata(path, self._image_adapter))
-        if self._file_type_adapter.is_image(path):
-            metadata.add(ImageFileMetadata(path, self._image_adapter))
-        if self._file_type_adapter.is_audio(path):
-            metadata.add(AudioFileMetadata(path, self._audio_adapter))
-        if self._file_type_adapter.is_video(path):
-            metadata.add(
-                VideoFileMetadata(
-                    path=path,
-                    video_adapter=self._video_adapter,
-                    image_adapter=self._image_adapter,
-                )
-            )
+        metadata.add(FileMetadata(path, self._image_adapter, size))
+        create = self._CREATORS.get(self._file_type_adapter.classify(path))
+        if create is not None:
+            metadata.add(create(self, path))
         return metadata
+
+    def _create_image_metadata(self, path: Path) -> Metadata:
+        return ImageFileMetadata(path, self._image_adapter)
+
+    def _create_audio_metadata(self, path: Path) -> Metadata:
+        return AudioFileMetadata(path, self._audio_adapter)
+
+    def _create_video_metadata(self, path: Path) -> Metadata:
+        return VideoFileMetadata(
+            path=path,
+            video_adapter=self._video_adapter,
+            image_adapter=self._image_adapter,
+        )
+
+    _CREATORS: dict[FileType, Callable[["FileMetadataFactory", Path], Metadata]] = {
+        FileType.IMAGE: _create_image_metadata,
+        FileType.AUDIO: _create_audio_metadata,
+        FileType.VIDEO: _create_video_metadata,
+    }
+
+    # What a batch worker computes ahead of the caller, for each metadata type
+    _PRECOMPUTED: dict[type, Callable[[Metadata], object]] = {
+        FileMetadata: attrgetter("histogram_image_metadata"),
+        ImageFileMetadata: attrgetter("image_metadata"),
+        AudioFileMetadata: attrgetter("duration", "entropy"),
+        VideoFileMetadata: attrgetter("duration"),
+    }
+
+    def create_metadata_batch(
+        self, paths: Iterable[Path], workers: Optional[int] = None
+    ) -> list[CompositeMetadata]:
+        """
+        Creates metadata for many paths concurrently, preserving input order.
+
+        Each worker hashes its file while building the byte histogram and
+        its image metrics, then computes the image, audio or video metadata,
+        so that reading them afterwards does no further work. Fractal
+        dimensions stay lazy. A failure is left for the caller to hit when
+        reading the value, as with create_metadata.
+        """
+
+        # Threads rather than processes: adapters hold digest objects that
+        # cannot be pickled, and hashing/NumPy/PIL release the GIL anyway
+        def create_metadata(path: Path) -> CompositeMetadata:
+            metadata = self.create_metadata(path)
+            for child in metadata.children:
+                if (precompute := self._PRECOMPUTED.get(type(child))) is not None:
+                    with suppress(Exception):
+                        precompute(child)
+            return metadata
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(create_metadata, paths))
@@ -1,4 +1,3 @@
-from functools import cached_property
 from typing import TypedDict
 
 import numpy as np
@@ -9,6 +8,25 @@ from metadata.metadata_base import Metadata
 
 
 class ImageMetadata(Metadata):
+    __slots__ = (
+        "_width",
+        "_height",
+        "_image_entropy",
+        "_image_histogram",
+        "_contrast",
+        "_edge_intensity",
+        "_saturation",
+        "_colourfulness",
+        "_sharpness",
+        "_blurriness",
+        "_exposure",
+        "_vibrance",
+        "_noise",
+        "_image_adapter",
+        "_fractal_source",
+        "_fractal_dimension",
+    )
+
     class Arguments(TypedDict):
         image: Required[Image]
         image_adapter: Required[ImageAdapter]
@@ -23,7 +41,11 @@ class ImageMetadata(Metadata):
         self._image_entropy = list(
             map(image_adapter.entropy, [thumbnail_image, *quadrants])
         )
-        self._image_histogram = image_adapter.rgb_histogram(thumbnail_image)
+        # Histograms are kept as compact uint32 arrays rather than lists of
+        # boxed ints, and only turned into lists when read
+        self._image_histogram = np.asarray(
+            image_adapter.rgb_histogram(thumbnail_image), dtype=np.uint32
+        )
         grayscale_image = image_adapter.to_grayscale(thumbnail_image)
         gray_quadrants = image_adapter.quadrants(grayscale_image)
         self._contrast = list(
@@ -32,15 +54,15 @@ class ImageMetadata(Metadata):
         self._edge_intensity = list(
             map(image_adapter.edge_intensity, [grayscale_image, *gray_quadrants])
         )
-        self._saturation = image_adapter.saturation_histogram(thumbnail_image)
+        self._saturation = np.asarray(
+            image_adapter.saturation_histogram(thumbnail_image), dtype=np.uint32
+        )
+        # The LAB conversion is per pixel, so it is done once for the whole
+        # thumbnail and the quadrants are cropped from the converted image
+        lab_image = image_adapter.to_lab(thumbnail_image)
+        lab_quadrants = image_adapter.quadrants(lab_image)
         self._colourfulness = list(
-            map(
-                image_adapter.colourfulness,
-                [
-                    thumbnail_image,
-                    *quadrants,
-                ],
-            )
+            map(image_adapter.colourfulness, [lab_image, *lab_quadrants])
         )
         self._sharpness = list(
             map(image_adapter.sharpness, [grayscale_image, *gray_quadrants])
@@ -51,15 +73,15 @@ class ImageMetadata(Metadata):
         self._exposure = list(
             map(image_adapter.exposure, [grayscale_image, *gray_quadrants])
         )
-        self._vibrance = list(
-            map(image_adapter.vibrance, [thumbnail_image, *quadrants])
-        )
+        self._vibrance = list(map(image_adapter.vibrance, [lab_image, *lab_quadrants]))
         self._noise = list(map(image_adapter.noise, [grayscale_image, *quadrants]))
-        self._fractal_dimension = (
-            image_adapter.fractal_dimension(grayscale_image)
-            if args.get("fractal_dimension", False)
-            else []
+        # Box counting is by far the most expensive metric, so it is deferred
+        # until fractal_dimension is read
+        self._image_adapter = image_adapter
+        self._fractal_source = (
+            grayscale_image if args.get("fractal_dimension", False) else None
         )
+        self._fractal_dimension = None
 
     @property
     def width(self) -> int:
@@ -71,11 +93,19 @@ class ImageMetadata(Metadata):
 
     @property
     def fractal_dimension(self) -> list[float]:
+        if self._fractal_dimension is None:
+            if self._fractal_source is None:
+                self._fractal_dimension = []
+            else:
+                grayscale_image, self._fractal_source = self._fractal_source, None
+                self._fractal_dimension = self._image_adapter.fractal_dimension(
+                    grayscale_image
+                )
         return self._fractal_dimension
 
     @property
     def rgb_histogram(self) -> list[int]:
-        return self._image_histogram
+        return self._image_histogram.tolist()
 
     @property
     def entropy(self) -> list[float]:
@@ -87,7 +117,7 @@ class ImageMetadata(Metadata):
 
     @property
     def saturation_histogram(self) -> list[int]:
-        return self._saturation
+        return self._saturation.tolist()
 
     @property
     def edge_intensity(self) -> list[float]:
@@ -119,35 +149,42 @@ class ImageMetadata(Metadata):
 
     @property
     def vector(self) -> Array:
-        return np.array(
+        # Concatenate the stored sequences directly, rather than unpacking
+        # every element into one large list first
+        return np.concatenate(
             [
-                self.width,
-                self.height,
-                *self.rgb_histogram,
-                *self.entropy,
-                *self.contrast,
-                *self.saturation_histogram,
-                *self.edge_intensity,
-                *self.colourfulness,
-                *self.sharpness,
-                *self.blurriness,
-                *self.exposure,
-                *self.vibrance,
-                *self.noise,
-                *self.fractal_dimension,
-            ]
+                (self._width, self._height),
+                self._image_histogram,
+                self._image_entropy,
+                self._contrast,
+                self._saturation,
+                self._edge_intensity,
+                self._colourfulness,
+                self._sharpness,
+                self._blurriness,
+                self._exposure,
+                self._vibrance,
+                self._noise,
+                self.fractal_dimension,
+            ],
+            dtype=np.float64,
         )
 
 
 class ImageFileMetadata(Metadata):
+    __slots__ = ("_path", "_image_adapter", "_image_metadata")
+
     def __init__(self, path, image_adapter: ImageAdapter):
         self._path = path
         self._image_adapter = image_adapter
+        self._image_metadata = None
 
-    @cached_property
+    @property
     def image_metadata(self) -> ImageMetadata:
-        return ImageMetadata(
-            image=self._image_adapter.load(self._path),
-            image_adapter=self._image_adapter,
-            fractal_dimension=True,
-        )
+        if self._image_metadata is None:
+            self._image_metadata = ImageMetadata(
+                image=self._image_adapter.load(self._path),
+                image_adapter=self._image_adapter,
+                fractal_dimension=True,
+            )
+        return self._image_metadata
@@ -2,4 +2,4 @@ from abc import ABC
 
 
 class Metadata(ABC):
-    ...
+    __slots__ = ()
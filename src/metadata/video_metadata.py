@@ -1,4 +1,3 @@
-from functools import cached_property
 from pathlib import Path
 from typing import TypedDict
 
@@ -9,6 +8,8 @@ from .metadata_base import Metadata
 
 
 class VideoFileMetadata(Metadata):
+    __slots__ = ("_path", "_video_adapter", "_image_adapter", "_video_metrics")
+
     class Arguments(TypedDict):
         path: Required[Path]
         video_adapter: Required[VideoAdapter]
@@ -19,6 +20,7 @@ class VideoFileMetadata(Metadata):
         self._path = args["path"]
         self._video_adapter = args["video_adapter"]
         self._image_adapter = args["image_adapter"]
+        self._video_metrics = None
 
     @property
     def duration(self) -> float:
@@ -36,6 +38,8 @@ class VideoFileMetadata(Metadata):
     def height(self) -> int:
         return self._metrics.height
 
-    @cached_property
+    @property
     def _metrics(self):
-        return self._video_adapter.metrics(self._path)
+        if self._video_metrics is None:
+            self._video_metrics = self._video_adapter.metrics(self._path)
+        return self._video_metrics
@@ -1,7 +1,6 @@
 import argparse
 import datetime
 import sys
-from collections import defaultdict
 from pathlib import Path
 
 from model import Logbook, MarkdownParser, Day
@@ -11,12 +10,13 @@ def main(args: argparse.Namespace):
     def adjust_markdown(new_day: Day):
         def rewrite_header_1(day: Day):
             if day:
-                lines = day.path.read_text(encoding="utf-8").splitlines()
+                content = day.path.read_text(encoding="utf-8")
+                lines = content.splitlines()
                 lines[0] = day.headers[0].template
-                day.path.write_text(
-                    MarkdownParser.normalize_markdown("\n".join(lines)),
-                    encoding="utf-8",
-                )
+                normalized = MarkdownParser.normalize_markdown("\n".join(lines))
+                # Neighbouring days are usually unchanged, so leave them be
+                if normalized != content:
+                    day.path.write_text(normalized, encoding="utf-8")
 
         rewrite_header_1(new_day.previous.get("", None))
         rewrite_header_1(new_day)
@@ -38,16 +38,8 @@ def main(args: argparse.Namespace):
 
 def validate(logbook: Logbook):
     parse_result = logbook.parse()
-    errors = defaultdict(list)
-    # noinspection PyTypeChecker
-    for e in sorted(parse_result.errors):
-        errors[e.path].append(e)
-    for errs in errors.values():
-        print(f"[{errs[0].path.relative_to(logbook.root).as_posix()}]")
-        for e in errs:
-            print(f"> {e.message}")
-            if e.hint:
-                print(e.hint)
+    # One write instead of a locked, possibly flushed print per line
+    sys.stdout.write(parse_result.report(logbook.root))
     if not parse_result.valid:
         sys.exit(1)
 
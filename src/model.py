@@ -11,8 +11,10 @@ try:
 except ImportError:
     from itertools_alt import pairwise
 
-from os import walk
-from os.path import relpath
+from itertools import groupby
+from operator import attrgetter
+from os import walk, curdir, sep
+from os.path import relpath, join
 from pathlib import Path
 from typing import (
     List,
@@ -66,6 +68,27 @@ class ParseResult:
         self.errors.extend(other.errors)
         return self
 
+    def report(self, root: Path) -> str:
+        """The errors grouped by file, with paths relative to root."""
+        # Every error path is the root or lies under it, so stripping the root
+        # gives the same result as Path.relative_to without building new paths.
+        # Children of Path(".") carry no "./" prefix to strip.
+        root = str(root)
+        root_prefix = "" if root == curdir else join(root, "")
+        lines = []
+        # Errors order by path first, so each file's errors are already adjacent
+        # noinspection PyTypeChecker
+        for path, errs in groupby(sorted(self.errors), key=attrgetter("path")):
+            relative = (
+                "." if str(path) == root else str(path).removeprefix(root_prefix)
+            ).replace(sep, "/")
+            lines.append(f"[{relative}]")
+            for e in errs:
+                lines.append(f"> {e.message}")
+                if e.hint:
+                    lines.append(e.hint)
+        return "".join(f"{line}\n" for line in lines)
+
 
 ExtendsParsable = TypeVar("ExtendsParsable", bound="Parsable")
 
@@ -679,7 +702,7 @@ class DayHeader(Parsable):
                 for a in actual.iterlinks():
                     if (
                         a[0].text.strip() not in ["❮", "❯"]
-                        and len(re.findall(a[0].text, placeholder)) == 1
+                        and placeholder.count(a[0].text) == 1
                     ):
                         title = a[0].attrib.get("title", "").strip()
                         link_target = f'{a[2]} "{title}"' if title else a[2]
@@ -808,6 +831,7 @@ class MarkdownParser:
         )
 
     @classmethod
+    @lru_cache
     def normalize_markdown(cls, content) -> str:
         parser = cls.markdown_to_markdown_parser()
         tokens = parser.parse(content)
@@ -835,6 +859,7 @@ class MarkdownParser:
         cls.__markdown_to_html_parser.cache_clear()
         cls.markdown_to_markdown_parser.cache_clear()
         cls.markdown_to_html_document.cache_clear()
+        cls.normalize_markdown.cache_clear()
 
     @staticmethod
     @lru_cache
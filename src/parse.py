@@ -1,5 +1,5 @@
 import argparse
-from collections import defaultdict
+import sys
 from pathlib import Path
 
 from model import Logbook
@@ -11,16 +11,8 @@ def main(args: argparse.Namespace):
 
 def validate(logbook: Logbook) -> int:
     parse_result = logbook.parse()
-    errors = defaultdict(list)
-    # noinspection PyTypeChecker
-    for e in sorted(parse_result.errors):
-        errors[e.path].append(e)
-    for errs in errors.values():
-        print(f"[{errs[0].path.relative_to(logbook.root).as_posix()}]")
-        for e in errs:
-            print(f"> {e.message}")
-            if e.hint:
-                print(e.hint)
+    # One write instead of a locked, possibly flushed print per line
+    sys.stdout.write(parse_result.report(logbook.root))
     if not parse_result.valid:
         return 1
     return 0
@@ -0,0 +1,13 @@
+"""NumPy versions of the statistics functions used in test assertions."""
+import numpy as np
+
+
+def quantiles(data) -> list[float]:
+    # Weibull positions are what statistics.quantiles calls "exclusive"
+    return np.quantile(
+        np.asarray(data, dtype=np.float64), [0.25, 0.5, 0.75], method="weibull"
+    ).tolist()
+
+
+def stdev(data) -> float:
+    return float(np.asarray(data, dtype=np.float64).std(ddof=1))
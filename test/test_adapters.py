@@ -1,22 +1,31 @@
+import os
+import shutil
 from base64 import b64encode
 from hashlib import blake2b
 from io import BytesIO
 from pathlib import Path
 from unittest.mock import patch
 
+import magic
+import numpy as np
 from PIL import Image as PILImage
-from pytest import approx
+from pytest import approx, fixture, importorskip, mark, raises
 
 from adapter import (
     Image,
     AudioAdapter,
     FileTypeAdapter,
+    FileType,
     DefaultFileTypeAdapter,
     VideoAdapter,
+    Blake3Digest,
+)
+from adapter.image_adapter import DefaultImageAdapter, histogram_entropy
+from adapter.video_adapter import (
+    DefaultVideoAdapter,
+    FfmpegVideoAdapter,
+    OpencvVideoAdapter,
 )
-from adapter.audio_adapter import LibrosaAudioAdapter
-from adapter.image_adapter import DefaultImageAdapter
-from adapter.video_adapter import DefaultVideoAdapter
 
 FIXTURES = Path(__file__).parent / "fixtures"
 AUDIO_FILE = FIXTURES / "100Hz_44100Hz_16bit_05sec.mp3"
@@ -47,10 +56,16 @@ def test_from_data_url():
 
 
 def test_default_audio_adapter():
+    # Importing librosa takes seconds, so only tests that need it pay for it
+    from adapter.audio_adapter import LibrosaAudioAdapter
+
     adapter: AudioAdapter = LibrosaAudioAdapter()
     audio_file = AUDIO_FILE
     assert adapter.metrics(audio_file)["duration"] == approx(5.0, 0.01)
     assert adapter.metrics(audio_file)["entropy"] == approx(1.96, 0.01)
+    with patch("adapter.audio_adapter.librosa.load") as load:
+        assert adapter.duration(audio_file) == approx(5.0, 0.01)
+        load.assert_not_called()
 
 
 def test_default_image_adapter():
@@ -60,6 +75,12 @@ def test_default_image_adapter():
     assert image.height == 821
 
 
+def test_histogram_entropy_matches_pillow():
+    adapter = DefaultImageAdapter()
+    for image in [adapter.load(COLOUR_IMAGE), adapter.load(GRAYSCALE_IMAGE)]:
+        assert histogram_entropy(image) == approx(image.entropy())
+
+
 def test_default_image_adapter_checksum_default_digest():
     with patch(
         f"{DefaultImageAdapter.__module__}.{blake2b.__name__}"
@@ -82,24 +103,24 @@ def test_default_image_adapter_checksum_custom_digest():
     assert checksum == one_time_hash(one_pixel_image)
 
 
-def test_default_file_type_adapter_image():
-    adapter: FileTypeAdapter = DefaultFileTypeAdapter()
+def test_default_file_type_adapter_image(file_type_adapter):
+    adapter = file_type_adapter
     assert adapter.is_image(COLOUR_IMAGE)
     assert adapter.is_image(GRAYSCALE_IMAGE)
     assert not adapter.is_image(AUDIO_FILE)
     assert not adapter.is_image(VIDEO_FILE)
 
 
-def test_default_file_type_adapter_audio():
-    adapter: FileTypeAdapter = DefaultFileTypeAdapter()
+def test_default_file_type_adapter_audio(file_type_adapter):
+    adapter = file_type_adapter
     assert not adapter.is_audio(COLOUR_IMAGE)
     assert not adapter.is_audio(GRAYSCALE_IMAGE)
     assert adapter.is_audio(AUDIO_FILE)
     assert not adapter.is_audio(VIDEO_FILE)
 
 
-def test_default_file_type_adapter_video():
-    adapter: FileTypeAdapter = DefaultFileTypeAdapter()
+def test_default_file_type_adapter_video(file_type_adapter):
+    adapter = file_type_adapter
     assert not adapter.is_video(COLOUR_IMAGE)
     assert not adapter.is_video(GRAYSCALE_IMAGE)
     assert not adapter.is_video(AUDIO_FILE)
@@ -121,3 +142,202 @@ def test_default_video_adapter_frame_spec():
     assert spec.size == (202, 256)
     assert spec.frame_numbers == ([4, 20, 36, 52, 68, 84, 100, 116, 132])
     assert spec.total_number_of_frames == 149
+
+
+def test_opencv_video_adapter_counts_failed_retrieves_as_missed_frames():
+    metrics = VideoAdapter.Metrics(5.0, 30.0, 190, 240, 149)
+    spec = VideoAdapter.FrameSpec(metrics, (202, 256), [4, 20, 36, 52, 68])
+    with patch("adapter.video_adapter.cv2.VideoCapture") as video_capture:
+        capture = video_capture.return_value
+        capture.grab.return_value = True
+        capture.retrieve.return_value = (False, None)
+        with raises(IOError, match="third strike"):
+            OpencvVideoAdapter().frames(VIDEO_FILE, spec)
+        assert capture.retrieve.call_count == 4
+        capture.release.assert_called_once()
+
+
+class FakeVideoCapture:
+    """Frames are filled with their own number; grabbing failing_frame fails."""
+
+    def __init__(self, failing_frame: int):
+        self.failing_frame = failing_frame
+        self.position = 0
+
+    def isOpened(self):
+        return True
+
+    def set(self, _, position):
+        self.position = position
+        return True
+
+    def grab(self):
+        self.position += 1
+        return self.position - 1 != self.failing_frame
+
+    def retrieve(self):
+        return True, np.full((4, 4, 3), self.position - 1, dtype=np.uint8)
+
+    def release(self):
+        pass
+
+
+@mark.parametrize("failing_frame", [10, 20])
+def test_opencv_video_adapter_seeks_after_a_failed_grab(failing_frame):
+    metrics = VideoAdapter.Metrics(5.0, 30.0, 190, 240, 149)
+    spec = VideoAdapter.FrameSpec(metrics, (2, 2), [4, 20, 36])
+    with patch(
+        "adapter.video_adapter.cv2.VideoCapture",
+        return_value=FakeVideoCapture(failing_frame),
+    ):
+        frames = OpencvVideoAdapter().frames(VIDEO_FILE, spec)
+    expected = [n for n in spec.frame_numbers if n != failing_frame]
+    assert [image.getpixel((0, 0))[0] for image, _ in frames] == expected
+    assert [position for _, position in frames] == [n / 149 for n in expected]
+
+
+def test_ffmpeg_video_adapter_probes_once_per_file_version(tmp_path):
+    adapter = FfmpegVideoAdapter()
+    video_file = tmp_path / "video.mp4"
+    shutil.copy(VIDEO_FILE, video_file)
+    stream = {
+        "index": 0,
+        "codec_type": "video",
+        "avg_frame_rate": "30/1",
+        "width": 190,
+        "height": 240,
+    }
+    probe_result = {"streams": [stream], "format": {"duration": "5.0"}}
+    with patch(
+        "adapter.video_adapter.ffmpeg.probe", return_value=probe_result
+    ) as probe:
+        assert adapter.metrics(video_file).duration == 5.0
+        assert adapter.metrics(video_file).frame_rate == 30.0
+        assert probe.call_count == 2
+        mtime_ns = video_file.stat().st_mtime_ns + 1_000_000_000
+        os.utime(video_file, ns=(mtime_ns, mtime_ns))
+        stream["avg_frame_rate"] = "25/1"
+        assert adapter.metrics(video_file).frame_rate == 25.0
+        assert probe.call_count == 4
+
+
+def test_default_file_type_adapter_classify(tmp_path, file_type_adapter):
+    adapter = file_type_adapter
+    text_file = tmp_path / "test.txt"
+    text_file.write_text("Hello World")
+    assert adapter.classify(COLOUR_IMAGE) is FileType.IMAGE
+    assert adapter.classify(AUDIO_FILE) is FileType.AUDIO
+    assert adapter.classify(VIDEO_FILE) is FileType.VIDEO
+    assert adapter.classify(text_file) is FileType.OTHER
+
+
+def test_default_file_type_adapter_sniffs_once_per_file_version(
+    tmp_path, file_type_adapter
+):
+    adapter = file_type_adapter
+    text_file = tmp_path / "test.txt"
+    text_file.write_text("Hello World")
+    with patch("adapter.magic.from_file", wraps=magic.from_file) as from_file:
+        assert not adapter.is_image(text_file)
+        assert not adapter.is_audio(text_file)
+        assert not adapter.is_video(text_file)
+        assert from_file.call_count == 1
+        text_file.write_text("Hello World, again")
+        assert adapter.classify(text_file) is FileType.OTHER
+        assert from_file.call_count == 2
+
+
+def test_default_file_type_adapter_trust_extensions(tmp_path, file_type_adapter):
+    adapter: FileTypeAdapter = DefaultFileTypeAdapter(trust_extensions=True)
+    mislabelled = tmp_path / "text.png"
+    mislabelled.write_text("Hello World")
+    unknown = tmp_path / "image.unknown"
+    unknown.write_bytes(COLOUR_IMAGE.read_bytes())
+    assert adapter.classify(mislabelled) is FileType.IMAGE
+    assert adapter.classify(unknown) is FileType.IMAGE
+    assert adapter.classify(tmp_path / "missing.mp3") is FileType.AUDIO
+    assert file_type_adapter.classify(mislabelled) is FileType.OTHER
+
+
+def test_default_file_type_adapter_signatures_agree_with_libmagic():
+    for path in FIXTURES.iterdir():
+        header = path.read_bytes()[: DefaultFileTypeAdapter.HEADER_SIZE]
+        if match := DefaultFileTypeAdapter.SIGNATURES.match(header):
+            assert magic.from_file(path, mime=True).startswith(match.lastgroup)
+
+
+def test_default_image_adapter_file_checksum():
+    adapter = DefaultImageAdapter()
+    for path in [COLOUR_IMAGE, VIDEO_FILE]:
+        assert adapter.file_checksum(path) == adapter.histogram(path)[1]
+
+
+def test_default_image_adapter_histogram_channels(tmp_path):
+    # Seven (0, 0) pairs and one (0, 1) pair scale to 0xFFFFFF and 0x249249,
+    # whose R, G and B bytes all differ
+    path = tmp_path / "pairs.bin"
+    path.write_bytes(bytes(8) + b"\x01")
+    histogram_image = DefaultImageAdapter().histogram(path)[0]
+    assert histogram_image.getpixel((0, 0)) == (0xFF, 0xFF, 0xFF)
+    assert histogram_image.getpixel((1, 0)) == (0x24, 0x92, 0x49)
+    assert histogram_image.getpixel((0, 1)) == (0, 0, 0)
+
+
+def test_default_image_adapter_empty_files_share_histogram(tmp_path):
+    adapter = DefaultImageAdapter()
+    empty_files = [tmp_path / "a.txt", tmp_path / "b.txt"]
+    for empty_file in empty_files:
+        empty_file.touch()
+    with patch.object(DefaultImageAdapter, "_count_byte_pairs") as count_byte_pairs:
+        (first, first_checksum), (second, second_checksum) = map(
+            adapter.histogram, empty_files
+        )
+    assert second is first
+    assert first_checksum == second_checksum == blake2b(digest_size=16).hexdigest()
+    assert first.getcolors() == [(256 * 256, (0, 0, 0))]
+    count_byte_pairs.assert_not_called()
+
+
+def test_default_image_adapter_histogram_without_mmap(monkeypatch):
+    # Small chunks, so that the reads and the mapping both span several
+    monkeypatch.setattr("adapter.image_adapter.HISTOGRAM_CHUNK_SIZE", 10_000)
+    adapter = DefaultImageAdapter()
+    mapped_image, mapped_checksum = adapter.histogram(COLOUR_IMAGE)
+    with patch("adapter.image_adapter.mmap.mmap", side_effect=OSError) as mapping:
+        read_image, read_checksum = adapter.histogram(COLOUR_IMAGE)
+    mapping.assert_called_once()
+    assert read_checksum == mapped_checksum
+    assert read_image.tobytes() == mapped_image.tobytes()
+
+
+def test_default_image_adapter_blake3_digest():
+    blake3 = importorskip("blake3")
+    adapter = DefaultImageAdapter(digest=Blake3Digest())
+    expected = blake3.blake3(COLOUR_IMAGE.read_bytes()).hexdigest(length=16)
+    assert adapter.histogram(COLOUR_IMAGE)[1] == expected
+    assert adapter.file_checksum(COLOUR_IMAGE) == expected
+
+
+def test_blake3_digest_copy():
+    blake3 = importorskip("blake3")
+    digest = Blake3Digest(digest_size=8)
+    digest.update(b"Hello")
+    copy = digest.copy()
+    copy.update(b" World")
+    assert digest.hexdigest() == blake3.blake3(b"Hello").hexdigest(length=8)
+    assert copy.hexdigest() == blake3.blake3(b"Hello World").hexdigest(length=8)
+
+
+def test_default_image_adapter_lab_metrics():
+    adapter = DefaultImageAdapter()
+    image = adapter.thumbnail(adapter.load(COLOUR_IMAGE))
+    lab_image = adapter.to_lab(image)
+    assert lab_image.mode == "LAB"
+    assert adapter.to_lab(lab_image) is lab_image
+    assert adapter.colourfulness(lab_image) == adapter.colourfulness(image)
+    assert adapter.vibrance(lab_image) == adapter.vibrance(image)
+
+
+@fixture(scope="module")
+def file_type_adapter() -> FileTypeAdapter:
+    return DefaultFileTypeAdapter()
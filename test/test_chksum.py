@@ -1,3 +1,5 @@
+import gc
+import mmap
 from pathlib import Path
 
 import pytest
@@ -11,6 +13,7 @@ from chksum import (
     Presenter,
     ChecksumCalculator,
     ProcessPoolChecksumCalculator,
+    ThreadPoolChecksumCalculator,
 )
 
 EMPTY_FILE_CHECKSUM = "3gng7kheu33tg"
@@ -237,6 +240,73 @@ def test_process_pool_calculator(tmp_path):
     assert results == [Checksum(path, EMPTY_FILE_CHECKSUM)]
 
 
+def test_process_pool_calculator_multiple_files(tmp_path):
+    paths = [tmp_path / f"test{i}.txt" for i in range(3)]
+    for path in paths:
+        path.touch()
+    calculator = ProcessPoolChecksumCalculator(QuarterSha256Base36Digester())
+    results = list(calculator.compute_checksums(paths))
+
+    assert sorted(results, key=lambda c: c.path) == [
+        Checksum(path, EMPTY_FILE_CHECKSUM) for path in paths
+    ]
+    assert list(calculator.compute_checksums([])) == []
+
+    # The worker pool outlives a single call
+    executor = calculator._executor
+    assert len(list(calculator.compute_checksums(paths))) == len(paths)
+    assert calculator._executor is executor
+
+
+def test_calculator_shuts_down_executor_when_collected(tmp_path):
+    paths = [tmp_path / f"test{i}.txt" for i in range(3)]
+    for path in paths:
+        path.touch()
+    calculator = ThreadPoolChecksumCalculator(QuarterSha256Base36Digester())
+    assert len(list(calculator.compute_checksums(paths))) == len(paths)
+    executor = calculator._executor
+    del calculator
+    gc.collect()
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
+
+
+def test_thread_pool_calculator(tmp_path):
+    paths = [tmp_path / f"test{i}.txt" for i in range(3)]
+    for i, path in enumerate(paths):
+        path.write_bytes(bytes([i]) * 4096)
+    digester = QuarterSha256Base36Digester()
+    calculator = ThreadPoolChecksumCalculator(digester)
+    results = list(calculator.compute_checksums(paths))
+
+    assert sorted(results, key=lambda c: c.path) == [
+        digester.compute_digest(path) for path in paths
+    ]
+
+
+def test_digester_small_and_mapped_files_agree(tmp_path, monkeypatch):
+    path = tmp_path / "test.txt"
+    path.write_bytes(bytes(range(256)) * 5)
+    digester = QuarterSha256Base36Digester()
+    expected = digester.compute_digest(path)
+    monkeypatch.setattr(QuarterSha256Base36Digester, "SMALL_FILE_SIZE", 0)
+    monkeypatch.setattr(QuarterSha256Base36Digester, "CHUNK_SIZE", 100)
+    assert digester.compute_digest(path) == expected
+
+
+@pytest.mark.parametrize("chunk_pages", [1, 3])
+def test_digester_releases_hashed_pages(tmp_path, monkeypatch, chunk_pages):
+    path = tmp_path / "test.bin"
+    path.write_bytes(bytes(range(256)) * (mmap.PAGESIZE * 5 // 256 + 3))
+    digester = QuarterSha256Base36Digester()
+    expected = digester.compute_digest(path)
+    monkeypatch.setattr(QuarterSha256Base36Digester, "SMALL_FILE_SIZE", 0)
+    monkeypatch.setattr(
+        QuarterSha256Base36Digester, "CHUNK_SIZE", chunk_pages * mmap.PAGESIZE
+    )
+    assert digester.compute_digest(path) == expected
+
+
 def assert_one_file(tmp_path):
     assert len(list(tmp_path.glob("*"))) == 1
 
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import fracdim
+
+
+def reference_box_counts(Z, threshold, sizes):
+    """The original reduceat box counting, one threshold at a time."""
+    Z = Z <= threshold
+    counts = []
+    for size in sizes:
+        S = np.add.reduceat(
+            np.add.reduceat(Z, np.arange(0, Z.shape[0], size), axis=0),
+            np.arange(0, Z.shape[1], size),
+            axis=1,
+        )
+        counts.append(np.count_nonzero((S > 0) & (S < size * size)))
+    return counts
+
+
+def reference_fractal_dimension(Z, threshold):
+    """The original reduceat implementation, one threshold at a time."""
+    sizes = 2 ** np.arange(int(np.log2(min(Z.shape))), 1, -1)
+    counts = reference_box_counts(Z, threshold, sizes)
+    coeffs = np.polyfit(np.log(sizes), np.log(np.array(counts) + 0.000001), 1)
+    return -coeffs[0]
+
+
+@pytest.mark.parametrize("shape", [(64, 64), (37, 50), (8, 5)])
+def test_box_counts_agree_with_reduceat(shape):
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, shape, dtype=np.uint8)
+    image[: shape[0] // 3] = 0
+    sizes = 2 ** np.arange(int(np.log2(min(shape))), 1, -1)
+    thresholds = np.array([-5, 0, 1, 64, 128, 200, 255, 300])
+    index = np.searchsorted(np.arange(256), thresholds, side="right")
+    assert fracdim._box_counts(image, sizes, index, 256).tolist() == [
+        reference_box_counts(image, t, sizes) for t in thresholds
+    ]
+
+
+@pytest.mark.parametrize("shape", [(64, 64), (37, 50), (256, 200)])
+def test_fractal_dimensions_agree_with_reduceat(shape):
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 256, shape, dtype=np.uint8)
+    thresholds = range(0, 256, 4)
+    assert fracdim.fractal_dimensions(image, thresholds) == pytest.approx(
+        [reference_fractal_dimension(image, t) for t in thresholds], abs=1e-12
+    )
+    assert fracdim.fractal_dimension(image, 100) == pytest.approx(
+        reference_fractal_dimension(image, 100), abs=1e-12
+    )
+
+
+@pytest.mark.parametrize(
+    "image, threshold",
+    [
+        (np.random.default_rng(2).random((64, 64)), 0.5),
+        (np.random.default_rng(3).integers(0, 1024, (50, 37)), 500),
+        (np.random.default_rng(4).integers(-3, 3, (32, 32), dtype=np.int8), 0),
+    ],
+)
+def test_fractal_dimension_of_other_dtypes(image, threshold):
+    assert fracdim.fractal_dimension(image, threshold) == pytest.approx(
+        reference_fractal_dimension(image, threshold), abs=1e-12
+    )
+    assert fracdim.fractal_dimension(image, threshold) > 1
@@ -1,21 +1,21 @@
+import statistics
 from functools import partial
 from pathlib import Path
-from statistics import quantiles, stdev
-from unittest.mock import MagicMock, PropertyMock
-from unittest.mock import Mock
+from unittest.mock import MagicMock
+from unittest.mock import Mock, patch
 
 import numpy as np
 import pytest
 from numpy.testing import assert_array_equal
 from pytest import approx
 
+from _stats import quantiles, stdev
 from adapter import (
     AudioAdapter,
     VideoAdapter,
     ImageAdapter,
     Image,
 )
-from adapter.audio_adapter import LibrosaAudioAdapter
 from adapter.image_adapter import DefaultImageAdapter
 from metadata.audio_metadata import AudioFileMetadata
 from metadata.file_metadata import (
@@ -24,6 +24,7 @@ from metadata.file_metadata import (
     FileMetadataFactory,
 )
 from metadata.image_metadata import ImageMetadata, ImageFileMetadata
+from metadata.metadata_base import Metadata
 from metadata.video_metadata import VideoFileMetadata
 
 FIXTURES = Path(__file__).parent.parent / "fixtures"
@@ -36,11 +37,16 @@ ONE_PIXEL_IMAGE = (
     "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAAAXNSR0IArs4c6QAAAA1JREFUGFdjYGBg+"
     "A8AAQQBAHAgZQsAAAAASUVORK5CYII="
 )
+# Histograms of the 256x256 histogram images of an empty file and of
+# "Hello World", whose ten distinct byte pairs each occur once
+EMPTY_FILE_RGB_HISTOGRAM = ([256 * 256] + 255 * [0]) * 3
+TEXT_FILE_RGB_HISTOGRAM = ([65526] + [0] * 254 + [10]) * 3
+UNSATURATED_HISTOGRAM = [65536] + [0] * 255
 
 around = partial(approx, rel=0.01)
 
 
-def test_vector():
+def test_vector(image_adapter):
     # Define mock ImageAdapter object
     mock_adapter = Mock(spec=ImageAdapter)
     mock_adapter.to_grayscale.return_value = Mock()
@@ -59,7 +65,7 @@ def test_vector():
     mock_adapter.fractal_dimension.return_value = [9.0, 10.0]
 
     # Define input arguments for ImageMetadata object
-    image = DefaultImageAdapter().from_data_url(ONE_PIXEL_IMAGE)
+    image = image_adapter.from_data_url(ONE_PIXEL_IMAGE)
     metadata_args = {
         "image": image,
         "image_adapter": mock_adapter,
@@ -89,11 +95,11 @@ def test_vector():
     assert_array_equal(metadata.vector, expected_vector)
 
 
-def test_vector_without_fractal_dimension():
-    image = DefaultImageAdapter().from_data_url(ONE_PIXEL_IMAGE)
+def test_vector_without_fractal_dimension(image_adapter):
+    image = image_adapter.from_data_url(ONE_PIXEL_IMAGE)
     metadata_args = {
         "image": image,
-        "image_adapter": DefaultImageAdapter(),
+        "image_adapter": image_adapter,
         "fractal_dimension": False,
     }
 
@@ -110,18 +116,21 @@ def test_audio_file_metadata():
     mock_audio_adapter.metrics.return_value = AudioAdapter.Metrics(
         duration=duration, entropy=entropy
     )
+    mock_audio_adapter.duration.return_value = duration
 
     audio_file_metadata = AudioFileMetadata(path, mock_audio_adapter)
 
     assert audio_file_metadata.duration == duration
+    mock_audio_adapter.metrics.assert_not_called()
     assert audio_file_metadata.entropy == 0.87
+    mock_audio_adapter.duration.assert_called_once_with(path)
     mock_audio_adapter.metrics.assert_called_once_with(path)
 
 
-def test_composite_metadata():
-    existing_file_metadata = FileMetadata(GRAYSCALE_IMAGE, DefaultImageAdapter())
-    new_file_metadata = FileMetadata(GRAYSCALE_IMAGE, DefaultImageAdapter())
-    audio_file_metadata = AudioFileMetadata(AUDIO_FILE, LibrosaAudioAdapter())
+def test_composite_metadata(image_adapter):
+    existing_file_metadata = FileMetadata(GRAYSCALE_IMAGE, image_adapter)
+    new_file_metadata = FileMetadata(GRAYSCALE_IMAGE, image_adapter)
+    audio_file_metadata = AudioFileMetadata(AUDIO_FILE, MagicMock(spec=AudioAdapter))
 
     composite_metadata = CompositeMetadata(existing_file_metadata)
 
@@ -141,6 +150,9 @@ def test_composite_metadata():
         existing_file_metadata,
         audio_file_metadata,
     ]
+    assert composite_metadata.get(Metadata) is existing_file_metadata
+    with pytest.raises(KeyError):
+        composite_metadata.get(ImageFileMetadata)
 
 
 def test_video_file_metadata():
@@ -149,7 +161,7 @@ def test_video_file_metadata():
         duration=4.0, frame_rate=30, width=256, height=256, number_of_frames=149
     )
     metadata = VideoFileMetadata(
-        path=MagicMock(spec=Path),
+        path=Path("/examples/video.mp4"),
         video_adapter=mock_video_adapter,
         image_adapter=MagicMock(spec=ImageAdapter),
     )
@@ -157,10 +169,10 @@ def test_video_file_metadata():
     assert metadata.frame_rate == around(30)
 
 
-def test_metadata_factory_empty_file(tmp_path):
+def test_metadata_factory_empty_file(tmp_path, file_factory):
     empty_file = tmp_path / "test.txt"
     empty_file.touch()
-    composite_metadata = FileMetadataFactory().create_metadata(empty_file)
+    composite_metadata = file_factory.create_metadata(empty_file)
     file_metadata = composite_metadata.get(FileMetadata)
     assert isinstance(file_metadata, FileMetadata)
     assert file_metadata.checksum == "cae66941d9efbd404e4d88758ea67670"
@@ -171,11 +183,11 @@ def test_metadata_factory_empty_file(tmp_path):
     )
     assert file_metadata.size == 0
     histogram_image_metadata = file_metadata.histogram_image_metadata
-    assert histogram_image_metadata.rgb_histogram == ([256 * 256] + 255 * [0]) * 3
+    assert histogram_image_metadata.rgb_histogram == EMPTY_FILE_RGB_HISTOGRAM
     assert quantiles(histogram_image_metadata.fractal_dimension) == around([0, 0, 0])
     assert histogram_image_metadata.entropy == around([1.584962] * 5)
     assert histogram_image_metadata.contrast == around([0] * 5)
-    assert histogram_image_metadata.saturation_histogram == [65536] + [0] * 255
+    assert histogram_image_metadata.saturation_histogram == UNSATURATED_HISTOGRAM
     assert histogram_image_metadata.edge_intensity == around([0] * 5)
     assert histogram_image_metadata.colourfulness == around([0] * 5)
     assert histogram_image_metadata.sharpness == around([0] * 5)
@@ -185,13 +197,25 @@ def test_metadata_factory_empty_file(tmp_path):
     assert histogram_image_metadata.vibrance == around([0] * 5)
 
 
-def test_metadata_factory_text_file(tmp_path):
+def test_empty_file_metadata_with_unhashable_adapter(tmp_path):
+    class UnhashableImageAdapter(DefaultImageAdapter):
+        __hash__ = None
+
+    empty_file = tmp_path / "empty.txt"
+    empty_file.touch()
+    file_metadata = FileMetadata(empty_file, UnhashableImageAdapter())
+    assert file_metadata.histogram_image_metadata.width == 256
+    assert file_metadata.checksum == "cae66941d9efbd404e4d88758ea67670"
+
+
+def test_metadata_factory_text_file(tmp_path, file_factory):
     text_file = tmp_path / "test.txt"
     text_file.write_text("Hello World")
-    composite_metadata = FileMetadataFactory().create_metadata(text_file)
+    composite_metadata = file_factory.create_metadata(text_file)
     file_metadata = composite_metadata.get(FileMetadata)
     assert isinstance(file_metadata, FileMetadata)
     assert file_metadata.checksum == "0cc84ab57c476d2385b899ca742a2790"
+    assert file_metadata.checksum_bytes == bytes.fromhex(file_metadata.checksum)
     assert file_metadata.path == text_file
     assert (
         file_metadata.path_with_checksum
@@ -217,14 +241,14 @@ def test_metadata_factory_text_file(tmp_path):
         [0.61, 0.61, 0.61]
     )
     assert histogram_image_metadata.noise == around([2071.01, 516.72, 0, 0, 0])
-    assert histogram_image_metadata.rgb_histogram == ([65526] + [0] * 254 + [10]) * 3
-    assert histogram_image_metadata.saturation_histogram == [65536] + [0] * 255
+    assert histogram_image_metadata.rgb_histogram == TEXT_FILE_RGB_HISTOGRAM
+    assert histogram_image_metadata.saturation_histogram == UNSATURATED_HISTOGRAM
     assert histogram_image_metadata.sharpness == around([198.3, 792.2, 0.0, 0.0, 0.0])
     assert histogram_image_metadata.vibrance == around([0] * 5)
 
 
-def test_metadata_factory_grayscale_image():
-    composite_metadata = FileMetadataFactory().create_metadata(GRAYSCALE_IMAGE)
+def test_metadata_factory_grayscale_image(file_factory):
+    composite_metadata = file_factory.create_metadata(GRAYSCALE_IMAGE)
     image_file_metadata = composite_metadata.get(ImageFileMetadata)
     assert isinstance(image_file_metadata, ImageFileMetadata)
     image_metadata = image_file_metadata.image_metadata
@@ -288,8 +312,8 @@ def test_metadata_factory_grayscale_image():
     assert quantiles(histogram_image_metadata.rgb_histogram) == around([0, 0, 0])
 
 
-def test_metadata_factory_colour_image_file():
-    composite_metadata = FileMetadataFactory().create_metadata(COLOUR_IMAGE)
+def test_metadata_factory_colour_image_file(file_factory):
+    composite_metadata = file_factory.create_metadata(COLOUR_IMAGE)
     image_file_metadata = composite_metadata.get(ImageFileMetadata)
     assert isinstance(image_file_metadata, ImageFileMetadata)
     image_metadata = image_file_metadata.image_metadata
@@ -355,8 +379,8 @@ def test_metadata_factory_colour_image_file():
     )
 
 
-def test_audio_file_metadata_factory():
-    composite_metadata = FileMetadataFactory().create_metadata(AUDIO_FILE)
+def test_audio_file_metadata_factory(file_factory):
+    composite_metadata = file_factory.create_metadata(AUDIO_FILE)
     audio_file_metadata = composite_metadata.get(AudioFileMetadata)
     assert isinstance(audio_file_metadata, AudioFileMetadata)
     assert audio_file_metadata.duration == around(5.0)
@@ -402,8 +426,8 @@ def test_audio_file_metadata_factory():
     )
 
 
-def test_video_file_metadata_factory_movie():
-    composite_metadata = FileMetadataFactory().create_metadata(VIDEO_FILE_MOVIE)
+def test_video_file_metadata_factory_movie(file_factory):
+    composite_metadata = file_factory.create_metadata(VIDEO_FILE_MOVIE)
     metadata = composite_metadata.get(VideoFileMetadata)
     assert metadata.duration == around(29.44)
     assert metadata.frame_rate == around(25)
@@ -455,8 +479,8 @@ def test_video_file_metadata_factory_movie():
     )
 
 
-def test_video_file_metadata_factory_animation():
-    composite_metadata = FileMetadataFactory().create_metadata(VIDEO_FILE_ANIMATION)
+def test_video_file_metadata_factory_animation(file_factory):
+    composite_metadata = file_factory.create_metadata(VIDEO_FILE_ANIMATION)
     metadata = composite_metadata.get(VideoFileMetadata)
     assert metadata.duration == around(4.96666)
     assert metadata.frame_rate == around(30)
@@ -511,9 +535,15 @@ def sample_file(tmp_path):
     return file_path
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
+def image_adapter():
+    """Fixture to create a DefaultImageAdapter shared by the module"""
+    return DefaultImageAdapter()
+
+
+@pytest.fixture(scope="module")
 def file_factory():
-    """Fixture to create a FileMetadataFactory object"""
+    """Fixture to create a FileMetadataFactory object shared by the module"""
     return FileMetadataFactory()
 
 
@@ -525,11 +555,118 @@ def test_file_metadata_creation(sample_file, file_factory):
     assert metadata.size == 11
 
 
+def test_file_metadata_size_comes_from_factory_stat(sample_file, file_factory):
+    metadata = file_factory.create_metadata(sample_file).get(FileMetadata)
+    sample_file.unlink()
+    assert metadata.size == 11
+
+
+def test_file_metadata_scans_file_lazily(sample_file):
+    mock_image_adapter = MagicMock(spec=ImageAdapter)
+    file_metadata = FileMetadata(sample_file, mock_image_adapter)
+    assert file_metadata.size == 11
+    mock_image_adapter.histogram.assert_not_called()
+
+
+def test_file_metadata_histogram_image_sets_checksum(sample_file):
+    mock_image_adapter = MagicMock(spec=ImageAdapter)
+    histogram_image = MagicMock(spec=Image)
+    mock_image_adapter.histogram.return_value = (histogram_image, "cafebabe")
+    file_metadata = FileMetadata(sample_file, mock_image_adapter)
+    assert file_metadata.histogram_image is histogram_image
+    assert file_metadata.checksum == "cafebabe"
+    mock_image_adapter.file_checksum.assert_not_called()
+    mock_image_adapter.thumbnail.assert_not_called()
+
+
+def test_metadata_has_no_instance_dict(tmp_path):
+    factory = FileMetadataFactory()
+    metadata = factory.create_metadata(GRAYSCALE_IMAGE)
+    file_metadata = metadata.get(FileMetadata)
+    assert file_metadata.path_with_checksum.suffix == ".jpg"
+    assert file_metadata.checksum_bytes
+    assert file_metadata.histogram_image_metadata.fractal_dimension
+    assert metadata.get(ImageFileMetadata).image_metadata.fractal_dimension
+    for m in [metadata, *metadata.children]:
+        assert not hasattr(m, "__dict__")
+    assert not hasattr(file_metadata.histogram_image_metadata, "__dict__")
+
+
+def test_metadata_factory_batch(tmp_path, file_factory):
+    paths = []
+    for i, text in enumerate(["", "Hello World", "sample text"]):
+        paths.append(tmp_path / f"test{i}.txt")
+        paths[-1].write_text(text)
+    batch = file_factory.create_metadata_batch(paths, workers=2)
+    assert [m.get(FileMetadata).path for m in batch] == paths
+    # A fresh factory, so that the expected checksums are computed anew
+    assert [m.get(FileMetadata).checksum for m in batch] == [
+        FileMetadataFactory().create_metadata(p).get(FileMetadata).checksum
+        for p in paths
+    ]
+
+
+def test_metadata_factory_batch_precomputes_metadata(tmp_path):
+    text_file = tmp_path / "test.txt"
+    text_file.write_text("Hello World")
+    image_adapter = DefaultImageAdapter()
+    factory = FileMetadataFactory(image_adapter=image_adapter)
+    batch = factory.create_metadata_batch([GRAYSCALE_IMAGE, text_file])
+    with patch.object(image_adapter, "histogram") as histogram, patch.object(
+        image_adapter, "file_checksum"
+    ) as file_checksum, patch.object(image_adapter, "load") as load:
+        for metadata in batch:
+            file_metadata = metadata.get(FileMetadata)
+            assert file_metadata.checksum
+            assert file_metadata.histogram_image_metadata.width == 256
+        assert batch[0].get(ImageFileMetadata).image_metadata.width == 1018
+        histogram.assert_not_called()
+        file_checksum.assert_not_called()
+        load.assert_not_called()
+
+
+def test_metadata_factory_reuses_metadata_until_file_changes(sample_file):
+    factory = FileMetadataFactory()
+    metadata = factory.create_metadata(sample_file).get(FileMetadata)
+    assert factory.create_metadata(sample_file).get(FileMetadata) is metadata
+    other_factory = FileMetadataFactory()
+    assert other_factory.create_metadata(sample_file).get(FileMetadata) is not metadata
+    sample_file.write_text("sample text, changed")
+    changed = factory.create_metadata(sample_file).get(FileMetadata)
+    assert changed is not metadata
+    assert changed.size == 20
+
+
+def test_metadata_factory_returns_independent_composites(sample_file):
+    factory = FileMetadataFactory()
+    metadata = factory.create_metadata(sample_file)
+    replacement = FileMetadata(sample_file, MagicMock(spec=ImageAdapter))
+    metadata.add(replacement, overwrite=True)
+    assert factory.create_metadata(sample_file).get(FileMetadata) is not replacement
+
+
+def test_metadata_factory_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(FileMetadataFactory, "METADATA_CACHE_SIZE", 2)
+    factory = FileMetadataFactory()
+    paths = [tmp_path / f"test{i}.txt" for i in range(3)]
+    for path in paths:
+        path.write_text(path.name)
+    first = [factory.create_metadata(p).get(FileMetadata) for p in paths]
+    assert factory.create_metadata(paths[2]).get(FileMetadata) is first[2]
+    assert factory.create_metadata(paths[0]).get(FileMetadata) is not first[0]
+
+
+def test_metadata_factory_builds_default_adapters_on_demand(sample_file):
+    factory = FileMetadataFactory()
+    factory.create_metadata(sample_file)
+    assert "_file_type_adapter" in vars(factory)
+    assert "_audio_adapter" not in vars(factory)
+    assert "_video_adapter" not in vars(factory)
+
+
 def test_image_metadata():
     mock_image_adapter = MagicMock(spec=ImageAdapter)
-    mock_image = MagicMock(spec=Image)
-    mock_image.size.return_value = (800, 600)
-    type(mock_image).size = PropertyMock(return_value=(800, 600))
+    mock_image = MagicMock(spec=Image, size=(800, 600))
     assert mock_image.size == (800, 600)
 
     image_metadata = ImageMetadata(
@@ -538,3 +675,13 @@ def test_image_metadata():
 
     assert image_metadata.width == 800
     assert image_metadata.height == 600
+    mock_image_adapter.fractal_dimension.assert_not_called()
+    _ = image_metadata.fractal_dimension
+    _ = image_metadata.fractal_dimension
+    mock_image_adapter.fractal_dimension.assert_called_once()
+
+
+def test_stats_helpers_match_statistics():
+    data = [0, 3, 3, 7, 1, 255, 65536, 12, 5]
+    assert quantiles(data) == approx(statistics.quantiles(data))
+    assert stdev(data) == approx(statistics.stdev(data))
@@ -10,12 +10,15 @@ from typing import Callable
 import pytest
 from lxml.html import document_fromstring
 
+import mkday
+import parse
 from model import (
     Logbook,
     Year,
     Month,
     Day,
     ParseError,
+    ParseResult,
     Footer,
     DayHeader,
     MarkdownParser,
@@ -291,6 +294,16 @@ class TestLogbook:
         logbook = create_logbook_from_files(tmp_path, header_with_id_and_no_links)
         assert logbook.parse().valid
 
+    def test_parse_valid_day_header_link_text_is_not_a_pattern(self, tmp_path):
+        def header_with_link(day_text):
+            day_text = day_text.replace(
+                "## ❮ Thread [❯][3]", "## ❮ Thread [f(x][9] [❯][3]"
+            )
+            return day_text.replace("\n<footer", "\n[9]: ../../f.md\n\n<footer")
+
+        logbook = create_logbook_from_files(tmp_path, header_with_link)
+        assert logbook.parse().valid
+
     def test_parse_valid_day_valid_header_order(self, tmp_path_factory):
         def valid_header_order(order: list[int], day_text):
             extra = "\n".join(f'{"#" * i} Header {i}' for i in order)
@@ -573,6 +586,40 @@ class TestLogbook:
         path = logbook.years[0].days[0].path
         assert ParseError(path, "Repeated id") in errors
 
+    def test_parse_result_report(self):
+        root = Path("logbook")
+        result = ParseResult()
+        result.add_error(root / DAY_1_RELATIVE_PATH, "Second error", "Hint")
+        result.add_error(root, "Root error")
+        result.add_error(root / DAY_1_RELATIVE_PATH, "First error")
+        assert ParseResult().report(root) == ""
+        assert result.report(root) == dedent(
+            f"""\
+            [.]
+            > Root error
+            [{DAY_1_RELATIVE_PATH}]
+            > First error
+            > Second error
+            Hint
+            """
+        )
+
+    @pytest.mark.parametrize("validate", [parse.validate, mkday.validate])
+    @pytest.mark.parametrize("cwd, root", [("logbook", "."), (".", "logbook")])
+    def test_validate_prints_paths_relative_to_root(
+        self, tmp_path, monkeypatch, capsys, validate, cwd, root
+    ):
+        def invalidate_h2(day_text):
+            return re.sub(r"\n## ❮", "\n## <", day_text)
+
+        create_logbook_from_files(tmp_path, invalidate_h2)
+        monkeypatch.chdir(tmp_path / cwd)
+        with pytest.raises(SystemExit):
+            if validate(Logbook(Path(root))):
+                raise SystemExit(1)
+        output = capsys.readouterr().out
+        assert output.startswith(f"[{DAY_1_RELATIVE_PATH}]\n")
+
 
 class TestYear:
     def test_dataclass(self, tmp_path):
@@ -924,6 +971,15 @@ class TestMarkdownParser:
             """,
         )
 
+    def test_normalize_markdown_is_memoised(self):
+        MarkdownParser.invalidate_cache()
+        content = "[Figure 1](list_of_figures.md)\n"
+        normalized = MarkdownParser.normalize_markdown(content)
+        assert MarkdownParser.normalize_markdown(content) is normalized
+        assert MarkdownParser.normalize_markdown.cache_info().hits == 1
+        MarkdownParser.invalidate_cache()
+        assert MarkdownParser.normalize_markdown.cache_info().currsize == 0
+
     @staticmethod
     def assert_normalized_markdown(input_markdown: str, expected_markdown: str):
         assert (